@@ -1,12 +1,118 @@
-import streamlit as st
+import os
+
 import pandas as pd
-import plotly.express as px
+import streamlit as st
+
+from figures import (FigureCache, comparison_figure, country_map_figure, performance_figure, population_figure,
+                     top10_figure)
+from instrumentation import MetricsRegistry, StageRecorder, append_log, serve_metrics
+from ingest import LiveDataset, RankingStore
+from rankings import (REQUIRED_COLUMNS, SCORE_COLUMNS, NameSearch, compare_universities, country_aggregates,
+                      filter_positions, history_summary, iter_csv, rank_movements, sort_positions, top_movers,
+                      top_universities, trend_leaders, year_country_aggregates)
+
+# The dataset and its row index, shared read-only by every session. Each rerun
+# ingests new or changed ranking files first; when files are only added, the
+# index is extended instead of rebuilt.
+@st.cache_resource(show_spinner=False)
+def get_dataset():
+    return LiveDataset(RankingStore())
+
+# Trigram index over university names for the search pickers. Results are ordered
+# by the latest ranking, so it is rebuilt for each dataset version.
+@st.cache_resource(show_spinner=False, max_entries=2)
+def build_name_search(version, _data):
+    return NameSearch(_data)
+
+# Country counts of one year, cached per year version so that a new ranking file
+# only recomputes the years it contains
+@st.cache_resource(show_spinner=False, max_entries=100)
+def year_country_counts(year, year_version, _index):
+    return year_country_aggregates(_index.year(year))
+
+# Country aggregates of the whole dataset; the per-country summary spans every
+# year and is recomputed once per dataset version
+@st.cache_resource(show_spinner=False, max_entries=2)
+def build_country_aggregates(version, _dataset):
+    by_year_country = pd.concat(
+        [year_country_counts(year, _dataset.year_versions[year], _dataset.index) for year in _dataset.index.years],
+        ignore_index=True,
+    )
+    return country_aggregates(_dataset.data, by_year_country)
+
+# Rank movements of every university, computed once per dataset version for the
+# Performance insights and the movers leaderboards
+@st.cache_resource(show_spinner=False, max_entries=2)
+def build_rank_movements(version, _data):
+    return rank_movements(_data)
+
+# Filtered and sorted row positions of the Dataset Preview table; paging through
+# them only slices the cached positions
+@st.cache_resource(show_spinner=False, max_entries=20)
+def preview_positions(version, filters, sort, _index):
+    years, countries, name, ranges = filters
+    return sort_positions(_index.data, filter_positions(_index, years, countries, name, ranges), *sort)
+
+# CSV of the filtered rows for the download button, generated only when it is clicked
+def csv_download(data, positions):
+    return lambda: "".join(iter_csv(data, positions)).encode()
+
+# Figure cache shared by every session, bounded by FIGURE_CACHE_MB
+@st.cache_resource(show_spinner=False)
+def get_figure_cache():
+    return FigureCache()
+
+# A page's figure from the shared cache, keyed on (page, parameters, version), where
+# version is the dataset version, or the year version for figures of a single year;
+# build() only runs on a miss
+def cached_figure(page, params, version, build):
+    return get_figure_cache().get((page, params, version), build)
+
+# Search box with a country filter; returns only the best matching names, so the
+# browser never receives the full list of universities
+def search_universities(name_search, key):
+    query_col, country_col = st.columns([3, 1])
+    query = query_col.text_input("Search University:", key=f"{key}_query", placeholder="e.g. Oxford")
+    country = country_col.selectbox("Country:", options=["All"] + name_search.countries, key=f"{key}_country")
+    return name_search.search(query, None if country == "All" else country)
+
+# Single university picker backed by the name search
+def university_picker(name_search, label, key):
+    return st.selectbox(label, options=search_universities(name_search, key), key=key)
+
+# Process-wide stage metrics; serves /metrics on RANKINGS_METRICS_PORT when it is set,
+# bound to RANKINGS_METRICS_HOST (default 127.0.0.1)
+@st.cache_resource(show_spinner=False)
+def get_metrics_registry():
+    registry = MetricsRegistry()
+    if os.environ.get("RANKINGS_METRICS_PORT"):
+        serve_metrics(registry, int(os.environ["RANKINGS_METRICS_PORT"]),
+                      os.environ.get("RANKINGS_METRICS_HOST", "127.0.0.1"))
+    return registry
+
+# Send this rerun's stage timings to the configured sinks, and to the sidebar
+# debug panel when the page was opened with ?debug=1
+def report_stages(profiler, show_panel):
+    if not profiler.stages:
+        return
+    registry = get_metrics_registry()
+    registry.observe(profiler.stages)
+    if os.environ.get("RANKINGS_PROFILE_LOG"):
+        append_log(os.environ["RANKINGS_PROFILE_LOG"], profiler.stages)
+    if os.environ.get("RANKINGS_PROFILE_PROM"):
+        registry.write_textfile(os.environ["RANKINGS_PROFILE_PROM"])
+    if show_panel:
+        with st.sidebar.expander("🛠️ Debug: stage timings", expanded=True):
+            stages = pd.DataFrame(profiler.stages)
+            stages["ms"] = (stages.pop("seconds") * 1000).round(2)
+            stages["peak KiB"] = (stages.pop("peak_bytes") / 1024).round(1)
+            st.dataframe(stages, hide_index=True)
+            st.caption(f"Total: {stages['ms'].sum():.1f} ms")
 
 # Function to load data
 def load_data():
     try:
-        data = pd.read_csv("THE World University Rankings 2016-2025.csv")
-        return data
+        return get_dataset().refresh()
     except Exception as e:
         st.error(f"Error loading file: {e}")
         return None
@@ -14,29 +120,45 @@ def load_data():
 # Title of the application
 st.title("World University Rankings Explorer (2016-2025)")
 
+# Opt-in instrumentation: RANKINGS_PROFILE=1 for every session, or ?debug=1 for
+# one session, which also shows the debug panel
+show_debug_panel = st.query_params.get("debug") == "1"
+profiler = StageRecorder("app", enabled=show_debug_panel or os.environ.get("RANKINGS_PROFILE") == "1")
+
 # Load data
-data = load_data()
+with profiler.stage("load"):
+    dataset = load_data()
+data = dataset.data if dataset is not None else None
 
 if data is not None:
+    # Ranking files that failed validation are skipped by the ingest
+    for path, message in dataset.errors.items():
+        st.warning(f"Skipped {path}: {message}")
+
     # Check if required columns are present in the dataset
-    required_columns = ["Name", "Year", "Rank", "Country", "Teaching", "Research Environment", "Student Population"]
-    missing_columns = [col for col in required_columns if col not in data.columns]
+    missing_columns = [col for col in REQUIRED_COLUMNS if col not in data.columns]
 
     if missing_columns:
         st.error(f"The following required columns are missing from the dataset: {missing_columns}")
     else:
+        version = dataset.version
+        index = dataset.index
+        with profiler.stage("index"):
+            name_search = build_name_search(version, data)
+
         # Sidebar navigation menu
         st.sidebar.title("Menu")
         menu = ["Dataset Preview", "Top 10 Universities", "University Performance", 
-                "Distribution of Universities by Country", "Student Population Growth", "Comparison Between University"]
+                "Distribution of Universities by Country", "Student Population Growth", "Comparison Between University", "Rank Movers"]
         choice = st.sidebar.radio("Navigate to:", menu)
+        profiler.page = choice
 
         # Page 1: Dataset Preview
         if choice == "Dataset Preview":
             st.subheader("📊 Dataset Preview")
             st.markdown("""
                 Selamat datang di **Dataset Preview**! 🌟
-                Di sini, Anda dapat menjelajahi beberapa baris pertama dari dataset **THE World University Rankings (2016-2025)**. 
+                Di sini, Anda dapat menjelajahi seluruh dataset **THE World University Rankings (2016-2025)** halaman demi halaman: filter, urutkan, dan unduh data yang Anda butuhkan. 
                 Ini adalah kesempatan Anda untuk memeriksa apakah semua data telah dimuat dengan benar dan mendapatkan gambaran awal tentang universitas yang termasuk! 👩‍🎓👨‍🎓
 
                 **Apa yang ada dalam Dataset?** 📚
@@ -62,8 +184,57 @@ if data is not None:
                 Mari kita selami dan lihat apa yang ditawarkan data ini! 🔍
             """)
 
-            # Display the dataset preview
-            st.dataframe(data.head())
+            # Filter, sort dan paging dilakukan di server; hanya halaman yang terlihat dikirim ke browser
+            with st.expander("🔎 Filter & Sort", expanded=False):
+                year_col, country_col, name_col = st.columns(3)
+                preview_years = year_col.multiselect("Years:", options=index.years, key="preview_years")
+                preview_countries = country_col.multiselect("Countries:", options=name_search.countries,
+                                                            key="preview_countries")
+                preview_name = name_col.text_input("Name contains:", key="preview_name")
+
+                numeric_columns = [col for col in data.columns if col not in ("Name", "Country")]
+                range_col, sort_col, order_col = st.columns(3)
+                range_column = range_col.selectbox("Filter Column:", options=["None"] + numeric_columns,
+                                                   key="preview_range_column")
+                ranges = ()
+                if range_column != "None":
+                    low, high = float(data[range_column].min()), float(data[range_column].max())
+                    if low < high:
+                        selected_range = range_col.slider("Range:", low, high, (low, high),
+                                                          key=f"preview_range_{range_column}")
+                        # The full range filters nothing, so rows without a value stay in
+                        if selected_range != (low, high):
+                            ranges = ((range_column, selected_range),)
+                sort_column = sort_col.selectbox("Sort By:", options=["Year, Rank"] + list(data.columns),
+                                                 key="preview_sort")
+                ascending = order_col.radio("Order:", ["Ascending", "Descending"], key="preview_order") == "Ascending"
+
+            with profiler.stage("filter"):
+                filters = (tuple(preview_years), tuple(preview_countries), preview_name.strip(), ranges)
+                sort = (None, True) if sort_column == "Year, Rank" else (sort_column, ascending)
+                positions = preview_positions(version, filters, sort, index)
+
+            size_col, page_col = st.columns(2)
+            page_size = size_col.selectbox("Rows per Page:", options=[25, 50, 100], key="preview_page_size")
+            n_pages = max(1, -(-len(positions) // page_size))
+            # A new result size starts a new page widget, so the page never points past the end
+            page = page_col.number_input(f"Page (of {n_pages}):", min_value=1, max_value=n_pages, value=1,
+                                         key=f"preview_page_{len(positions)}_{page_size}")
+
+            with profiler.stage("filter"):
+                start = (page - 1) * page_size
+                preview = data.take(positions[start:start + page_size])
+            if len(positions):
+                st.caption(f"Menampilkan baris {start + 1}–{start + len(preview)} "
+                           f"dari {len(positions)} baris yang cocok ({len(data)} total).")
+            else:
+                st.caption(f"Tidak ada baris yang cocok dengan filter ({len(data)} total).")
+            with profiler.stage("serialize"):
+                st.dataframe(preview, hide_index=True)
+
+            st.download_button("⬇️ Download Filtered CSV", data=csv_download(data, positions),
+                               file_name="world_university_rankings_filtered.csv", mime="text/csv",
+                               disabled=len(positions) == 0)
 
 
         # Page 2: Top 10 Universities
@@ -87,32 +258,16 @@ if data is not None:
                 Mari kita selami peringkat dan lihat siapa yang berhasil masuk tahun ini! 🥇
             """)
 
-            selected_year = st.selectbox("Select a Year:", options=sorted(data["Year"].unique()))
-            top_10_data = data[data["Year"] == selected_year].nsmallest(10, "Rank")
+            selected_year = st.selectbox("Select a Year:", options=index.years)
+            with profiler.stage("filter"):
+                top_10_data = top_universities(index, selected_year)
 
             if not top_10_data.empty:
-                # Sort the data by Rank for better visualization
-                top_10_data = top_10_data.sort_values(by="Rank")
-
-                # Create a horizontal bar chart
-                fig = px.bar(
-                    top_10_data,
-                    x="Rank",
-                    y="Name",
-                    title=f"Top 10 Universities in {selected_year}",
-                    labels={"Name": "University", "Rank": "Rank"},
-                    text="Rank",
-                    orientation="h",  # Horizontal bar chart
-                    color="Rank",  # Color by rank for better visual distinction
-                    color_continuous_scale=px.colors.sequential.Viridis  # Use a sequential color scale
-                )
-                
-                # Reverse the order of the y-axis to show the best rank at the top
-                fig.update_yaxes(autorange="reversed")
-
-                fig.update_traces(texttemplate='%{text}', textposition='outside')  # Show rank outside the bars
-                fig.update_layout(xaxis=dict(title='Rank (1 is best)', autorange='reversed'))  # Clear x-axis title
-                st.plotly_chart(fig)
+                with profiler.stage("figure"):
+                    fig = cached_figure("top10", (selected_year,), dataset.year_versions[selected_year],
+                                        lambda: top10_figure(top_10_data, selected_year))
+                with profiler.stage("serialize"):
+                    st.plotly_chart(fig)
             else:
                 st.warning(f"No data available for the year {selected_year}.")
 
@@ -125,33 +280,41 @@ if data is not None:
             st.markdown("""
                 Penasaran bagaimana universitas favorit Anda telah berprestasi selama bertahun-tahun? 📅🔍
                 Visualisasi ini melacak tren peringkat universitas tertentu dari 2016 hingga 2025. 
-                Pilih universitas dari menu dropdown di bawah untuk melihat apakah mereka telah mencapai puncak baru atau menghadapi tantangan di sepanjang jalan! 🚀📉
+                Cari dan pilih universitas di bawah untuk melihat apakah mereka telah mencapai puncak baru atau menghadapi tantangan di sepanjang jalan! 🚀📉
                 
                 **Mengapa Ini Penting?** 🤔
                 Memahami kinerja universitas dari waktu ke waktu dapat memberikan wawasan tentang pertumbuhan, reputasi, dan kualitas pendidikan yang ditawarkannya. 
                 Apakah Anda seorang calon mahasiswa, alumni, atau hanya seorang penggemar pendidikan, informasi ini sangat berharga! 🎓✨
             """)
 
-            university = st.selectbox("Select a University:", options=data["Name"].unique())
-            uni_data = data[data["Name"] == university]
+            university = university_picker(name_search, "Select a University:", key="performance_university")
+            with profiler.stage("filter"):
+                uni_data = index.university(university)
 
             if not uni_data.empty:
-                fig = px.line(
-                    uni_data,
-                    x="Year",
-                    y="Rank",
-                    title=f"📊 Ranking Trend of {university} Over Time",
-                    labels={"Rank": "Rank", "Year": "Year"},
-                    markers=True
-                )
-                fig.update_yaxes(autorange="reversed")  # Best rank (1) at the top
-                st.plotly_chart(fig)
-
+                with profiler.stage("figure"):
+                    fig = cached_figure("performance", (university,), version,
+                                        lambda: performance_figure(uni_data, university))
+                with profiler.stage("serialize"):
+                    st.plotly_chart(fig)
+
+                with profiler.stage("aggregate"):
+                    movement = build_rank_movements(version, data).by_university.loc[university]
+                if pd.isna(movement["Trend Slope"]):
+                    trend = "-"
+                elif movement["Trend Slope"] < 0:
+                    trend = f"📈 Meningkat (rata-rata naik {-movement['Trend Slope']:.1f} peringkat per tahun)"
+                elif movement["Trend Slope"] > 0:
+                    trend = f"📉 Menurun (rata-rata turun {movement['Trend Slope']:.1f} peringkat per tahun)"
+                else:
+                    trend = "➖ Stabil"
+                volatility = "-" if pd.isna(movement["Volatility"]) else f"±{movement['Volatility']:.1f} peringkat per tahun"
                 st.markdown(f"""
                 **Insight Utama untuk {university}:** 🔑
-                - **Peringkat Terbaik yang Dicapai:** {uni_data['Rank'].min()} di {uni_data.loc[uni_data['Rank'].idxmin(), 'Year']}
-                - **Peringkat Saat Ini:** {uni_data['Rank'].iloc[-1]} di {uni_data['Year'].iloc[-1]}
-                - **Tren Keseluruhan:** {'📉 Menurun' if uni_data['Rank'].iloc[-1] > uni_data['Rank'].iloc[0] else '📈 Meningkat'}
+                - **Peringkat Terbaik yang Dicapai:** {movement['Best Rank']:.0f} di {movement['Best Year']}
+                - **Peringkat Saat Ini:** {movement['Current Rank']:.0f} di {movement['Current Year']}
+                - **Tren Keseluruhan:** {trend}
+                - **Fluktuasi Peringkat:** {volatility}
                 
                 Tren ini dapat membantu Anda memahami lintasan universitas dan kedudukannya dalam lanskap pendidikan global. 🌍
             """)
@@ -173,44 +336,35 @@ if data is not None:
 
                 **Cara Menggunakan Visualisasi Ini**: 
                 1. Amati peta untuk melihat jumlah universitas di setiap negara.
-                2. Gunakan animasi untuk melihat perubahan dari tahun ke tahun.
+                2. Geser slider tahun, atau aktifkan animasi penuh, untuk melihat perubahan dari tahun ke tahun.
                 3. Pertimbangkan bagaimana faktor-faktor seperti ekonomi dan kebijakan pendidikan dapat mempengaruhi jumlah universitas. 🔍
             """)
 
-            # Menghitung jumlah universitas per negara
-            count_data = data.groupby(["Year", "Country"]).size().reset_index(name="Count")
-
-            # Visualisasi peta menggunakan choropleth
-            fig = px.choropleth(
-                count_data,
-                locations="Country",  # Kolom negara
-                locationmode="country names",  # Menggunakan nama negara
-                color="Count",  # Data yang akan divisualisasikan
-                animation_frame="Year",  # Animasi berdasarkan tahun
-                title="📊 Jumlah Universitas per Negara dari Tahun ke Tahun",
-                labels={"Count": "Jumlah Universitas", "Country": "Negara"},
-                color_continuous_scale=px.colors.sequential.Plasma,
-                projection="natural earth"  # Menggunakan proyeksi peta yang lebih menarik
-            )
+            # Jumlah universitas per negara diambil dari agregat yang sudah dihitung
+            with profiler.stage("aggregate"):
+                aggregates = build_country_aggregates(version, dataset)
 
-            # Menambahkan anotasi untuk meningkatkan pemahaman
-            fig.update_layout(
-                title_x=0,  # Align title to the left
-                title_xanchor='left',  # Anchor the title to the left
-                title_font=dict(size=24),  # Increase title font size
-                geo=dict(
-                    showcoastlines=True,
-                    coastlinecolor="Black",
-                    showland=True,
-                    landcolor="lightgray",
-                    subunitcolor="Black",
-                    countrycolor="Black"
-                ),
-                margin=dict(l=0, r=0, t=40, b=0)  # Adjust margins
-            )
+            # Only the selected year's frame is sent by default; the full animation is opt-in
+            full_animation = st.toggle("Tampilkan animasi penuh (semua tahun)", value=False)
+            if full_animation:
+                map_year = None
+            else:
+                map_year = st.select_slider("Pilih Tahun:", options=index.years, value=index.years[-1])
+            with profiler.stage("figure"):
+                # A single-year map shares the colour range of the full animation, so it also
+                # depends on the largest count of any year
+                max_count = int(aggregates.by_year_country["Count"].max())
+                map_version = version if map_year is None else dataset.year_versions[map_year]
+                fig = cached_figure("country_map", (map_year, max_count), map_version,
+                                    lambda: country_map_figure(aggregates.by_year_country, map_year))
 
             # Menampilkan grafik
-            st.plotly_chart(fig)
+            with profiler.stage("serialize"):
+                st.plotly_chart(fig)
+
+            # Ringkasan negara dengan jumlah universitas terbanyak selama 2016-2025
+            st.markdown("**🏅 10 Negara dengan Jumlah Universitas Terbanyak (2016-2025)**")
+            st.dataframe(aggregates.by_country.nlargest(10, "Count"), hide_index=True)
 
             # Key insights section
             st.markdown("""
@@ -234,55 +388,34 @@ if data is not None:
                 - **Perencanaan Masa Depan**: Wawasan tentang tren pendaftaran dapat membantu universitas dalam merencanakan infrastruktur, fakultas, dan sumber daya di masa depan. 🏫
 
                 **Cara Menggunakan Fitur Ini**: 
-                1. Pilih universitas dari menu dropdown di bawah.
+                1. Cari universitas berdasarkan nama (dan negara) lalu pilih dari hasil pencarian.
                 2. Amati perubahan populasi mahasiswa dari tahun ke tahun.
                 3. Analisis tren dan pertimbangkan apa artinya bagi masa depan pendidikan! 🔍
 
                 Mari kita selami data dan lihat bagaimana populasi mahasiswa telah berubah seiring waktu! 🚀
             """)
 
-            university = st.selectbox("Select a University:", options=data["Name"].unique())
-            uni_data = data[data["Name"] == university]
+            university = university_picker(name_search, "Select a University:", key="population_university")
+            with profiler.stage("filter"):
+                uni_data = index.university(university)
 
             if not uni_data.empty:
-                # Create a line chart for student population growth
-                fig = px.line(
-                    uni_data,
-                    x="Year",
-                    y="Student Population",
-                    title=f"📊 Pertumbuhan Populasi Mahasiswa untuk {university}",
-                    labels={"Student Population": "Jumlah Mahasiswa", "Year": "Tahun"},
-                    markers=True
-                )
-                
-                # Add a fill area under the line for better visualization
-                fig.add_scatter(
-                    x=uni_data["Year"],
-                    y=uni_data["Student Population"],
-                    fill='tozeroy',
-                    mode='none',
-                    fillcolor='rgba(0, 100, 200, 0.2)'  # Light blue fill
-                )
-
-                # Update layout for better aesthetics
-                fig.update_layout(
-                    title_x=0,  # Align title to the left
-                    title_xanchor='left',  # Anchor the title to the left
-                    title_font=dict(size=20),  # Increase title font size
-                    xaxis=dict(title='Tahun'),
-                    yaxis=dict(title='Jumlah Mahasiswa'),
-                    margin=dict(l=40, r=40, t=40, b=40),  # Adjust margins
-                    hovermode="x unified"  # Unified hover for better readability
-                )
+                # Line chart of student population growth
+                with profiler.stage("figure"):
+                    fig = cached_figure("population", (university,), version,
+                                        lambda: population_figure(uni_data, university))
 
-                st.plotly_chart(fig)
+                with profiler.stage("serialize"):
+                    st.plotly_chart(fig)
 
                 # Key insights section
+                with profiler.stage("aggregate"):
+                    summary = history_summary(uni_data, "Student Population", best="max")
                 st.markdown(f"""
                     **Insight Utama untuk {university}:** 🔑
-                    - **Populasi Mahasiswa Saat Ini:** {uni_data['Student Population'].iloc[-1]} di {uni_data['Year'].iloc[-1]}
-                    - **Populasi Mahasiswa Tertinggi:** {uni_data['Student Population'].max()} di {uni_data.loc[uni_data['Student Population'].idxmax(), 'Year']}
-                    - **Tren Keseluruhan:** {'📈 Meningkat' if uni_data['Student Population'].iloc[-1] > uni_data['Student Population'].iloc[0] else '📉 Menurun'}
+                    - **Populasi Mahasiswa Saat Ini:** {summary['current']} di {summary['current_year']}
+                    - **Populasi Mahasiswa Tertinggi:** {summary['best']} di {summary['best_year']}
+                    - **Tren Keseluruhan:** {'📈 Meningkat' if summary['current'] > summary['first'] else '📉 Menurun'}
                     
                     Tren ini dapat membantu Anda memahami pertumbuhan universitas dan dampaknya terhadap lanskap pendidikan. 🌍
                 """)
@@ -301,7 +434,8 @@ if data is not None:
         elif choice == "Comparison Between University":
             st.subheader("🏫 Comparison Between Universities")
             st.markdown("""
-                Visualisasi ini menampilkan perbandingan universitas yang dipilih berdasarkan **Teaching**, **Research Environment** dan **Research Quality**. 📊✨
+                Visualisasi ini menampilkan perbandingan beberapa universitas yang dipilih berdasarkan skor THE seperti **Teaching**, **Research Environment** dan **Research Quality**. 📊✨
+                Pilih satu tahun untuk perbandingan langsung, atau rentang tahun untuk melihat tren setiap metrik.
                 
                 **Mengapa Ini Penting?** 🤔
                 - **Memahami Kekuatan**: Perbandingan ini membantu Anda memahami kekuatan dan kelemahan masing-masing universitas.
@@ -309,50 +443,53 @@ if data is not None:
                 - **Analisis Kebijakan**: Universitas dapat menggunakan data ini untuk merumuskan strategi peningkatan kualitas pendidikan. 📈
             """)
 
-            # Pilih universitas pertama
-            university_population1 = st.selectbox("Select the First University:", options=data["Name"].unique())
-            population_data1 = data[data["Name"] == university_population1]
-
-            # Pilih universitas kedua
-            university_population2 = st.selectbox("Select the Second University:", options=data["Name"].unique())
-            population_data2 = data[data["Name"] == university_population2]
-
-            # Menggabungkan data untuk visualisasi
-            comparison_data = pd.DataFrame({
-                'University': [university_population1, university_population2],
-                'Teaching': [population_data1['Teaching'].values[0], population_data2['Teaching'].values[0]],
-                'Research Environment': [population_data1['Research Environment'].values[0], population_data2['Research Environment'].values[0]],
-                'Research Quality': [population_data1['Research Quality'].values[0], population_data2['Research Quality'].values[0]]
-            })
-
-            # Mengubah DataFrame ke format panjang untuk visualisasi
-            comparison_data_long = comparison_data.melt(id_vars='University', 
-                                                        value_vars=['Teaching', 'Research Environment', 'Research Quality'],
-                                                        var_name='Metrics', 
-                                                        value_name='Score')
-
-            # Visualisasi perbandingan
-            fig = px.bar(comparison_data_long, 
-                        x='University', 
-                        y='Score', 
-                        color='Metrics', 
-                        title=f"📊 Perbandingan: {university_population1} VS {university_population2}",
-                        labels={"Score": "Score", "Metrics": "Metrics"},
-                        barmode='group',
-                        color_discrete_sequence=px.colors.qualitative.Set2)  # Use a qualitative color palette
-
-            # Menambahkan anotasi untuk meningkatkan pemahaman
-            fig.update_layout(
-                title_x=0,  # Align title to the left
-                title_xanchor='left',  # Anchor the title to the left
-                title_font=dict(size=16),  # Decrease title font size
-                xaxis=dict(title='Universities'),
-                yaxis=dict(title='Score'),
-                margin=dict(l=40, r=40, t=40, b=40)  # Adjust margins
+            # Pilih universitas, rentang tahun, dan metrik yang dibandingkan
+            latest_year = index.years[-1]
+            if "compare_universities" not in st.session_state:
+                st.session_state["compare_universities"] = list(index.year(latest_year)["Name"].head(2))
+            # Keep the current selection among the options next to the search matches
+            matches = search_universities(name_search, key="compare")
+            universities = st.multiselect(
+                "Select Universities:",
+                options=list(dict.fromkeys(st.session_state["compare_universities"] + matches)),
+                key="compare_universities",
+                max_selections=50,
+            )
+            start_year, end_year = st.select_slider(
+                "Select a Year or Range of Years:", options=index.years, value=(latest_year, latest_year)
+            )
+            metrics = st.multiselect(
+                "Select Metrics:",
+                options=SCORE_COLUMNS,
+                default=["Teaching", "Research Environment", "Research Quality"],
             )
 
-            # Menampilkan grafik
-            st.plotly_chart(fig)
+            if len(universities) < 2 or not metrics:
+                st.info("Pilih minimal dua universitas dan satu metrik untuk dibandingkan.")
+            else:
+                with profiler.stage("filter"):
+                    comparison_data_long = compare_universities(index, universities, (start_year, end_year), metrics)
+                missing = [name for name in universities if name not in set(comparison_data_long["University"])]
+                if comparison_data_long["Score"].isna().all():
+                    st.info("Tidak ada skor untuk universitas dan tahun yang dipilih. Coba pilih tahun atau universitas lain.")
+                else:
+                    if missing:
+                        st.warning(f"Tidak ada data pada tahun yang dipilih untuk: {', '.join(missing)}")
+
+                    with profiler.stage("figure"):
+                        fig = cached_figure("comparison", (tuple(universities), start_year, end_year, tuple(metrics)),
+                                            version, lambda: comparison_figure(comparison_data_long, start_year, end_year))
+
+                    # Menampilkan grafik
+                    with profiler.stage("serialize"):
+                        st.plotly_chart(fig)
+
+                    # Rata-rata skor per universitas pada periode yang dipilih; metrik tanpa skor tetap ditampilkan kosong
+                    with profiler.stage("aggregate"):
+                        mean_scores = comparison_data_long.pivot_table(index="University", columns="Metric", values="Score",
+                                                                       aggfunc="mean", sort=False)
+                        mean_scores = mean_scores.reindex(columns=metrics).astype(float)
+                    st.dataframe(mean_scores.round(1))
 
             # Key insights section
             st.markdown("""
@@ -362,5 +499,54 @@ if data is not None:
                 - Data ini dapat membantu dalam merumuskan strategi untuk meningkatkan kualitas pendidikan di masing-masing universitas. 📚
             """)
 
+        # Rank Movers
+        elif choice == "Rank Movers":
+            st.subheader("🚀 Rank Movers")
+            st.markdown("""
+                Universitas mana yang melonjak paling tinggi, dan mana yang paling banyak turun? 📈📉
+                Papan peringkat ini membandingkan peringkat setiap universitas dengan peringkatnya pada tahun sebelumnya ia masuk peringkat,
+                serta tren jangka panjangnya selama periode 2016-2025.
 
+                **Catatan**: Untuk universitas dengan peringkat rentang (misalnya 201–250), perubahan dihitung dari batas bawah rentang tersebut.
+            """)
+
+            with profiler.stage("aggregate"):
+                movements = build_rank_movements(version, data)
 
+            if len(index.years) < 2:
+                st.info("Dibutuhkan data minimal dua tahun untuk menghitung perubahan peringkat.")
+            else:
+                movers_year = st.select_slider("Select a Year:", options=index.years[1:], value=index.years[-1])
+                n_movers = st.slider("Number of Universities:", min_value=5, max_value=50, value=10, step=5)
+                mover_columns = ["Name", "Country", "Previous Year", "Previous Rank", "Rank", "Rank Change"]
+                with profiler.stage("filter"):
+                    risers = top_movers(movements, movers_year, n_movers)[mover_columns]
+                    fallers = top_movers(movements, movers_year, n_movers, fallers=True)[mover_columns]
+
+                risers_col, fallers_col = st.columns(2)
+                risers_col.markdown(f"**📈 Kenaikan Terbesar {movers_year}**")
+                risers_col.dataframe(risers, hide_index=True)
+                fallers_col.markdown(f"**📉 Penurunan Terbesar {movers_year}**")
+                fallers_col.dataframe(fallers, hide_index=True)
+
+                # Tren jangka panjang: kemiringan garis regresi peringkat terhadap tahun
+                if len(index.years) > 2:
+                    min_years = st.slider("Minimum Years Ranked:", min_value=2, max_value=len(index.years),
+                                          value=min(5, len(index.years)))
+                else:
+                    min_years = 2
+                trend_columns = ["Country", "Years Ranked", "First Rank", "Current Rank", "Trend Slope", "Volatility"]
+                with profiler.stage("filter"):
+                    improving = trend_leaders(movements, n_movers, min_years)[trend_columns]
+                    declining = trend_leaders(movements, n_movers, min_years, declining=True)[trend_columns]
+
+                improving_col, declining_col = st.columns(2)
+                improving_col.markdown("**📈 Tren Naik Paling Konsisten**")
+                improving_col.dataframe(improving.round(1))
+                declining_col.markdown("**📉 Tren Turun Paling Konsisten**")
+                declining_col.dataframe(declining.round(1))
+                st.caption("Trend Slope: rata-rata perubahan peringkat per tahun (negatif = naik). "
+                           "Volatility: simpangan baku perubahan peringkat tahunan.")
+
+# Stage timings of this rerun, when instrumentation is enabled
+report_stages(profiler, show_debug_panel)
@@ -0,0 +1,190 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+import pandas as pd
+import plotly
+import plotly.io as pio
+
+from figures import (comparison_figure, country_map_figure, performance_figure, population_figure,
+                     top10_figure)
+from ingest import RankingStore
+from rankings import (DATA_FILE, NameSearch, RankingIndex, compare_universities, country_aggregates,
+                      filter_positions, history_summary, iter_csv, rank_movements, read_csv, sort_positions,
+                      top_movers, top_universities, trend_leaders)
+
+# Headless benchmarks for the page computations of app.py. Every page is timed
+# stage by stage (load, filter, aggregate, figure, serialize) against the real CSV
+# and against synthetic copies scaled up from it, and the results are written
+# as a JSON report:
+#
+#   python benchmark.py --scales 1 10 100 --output bench.json
+
+
+# Synthetic dataset with `scale` copies of every university. Copies get a numbered
+# name and interleaved ranks, so each year stays a valid ranking of scale x as many rows.
+def synthetic_rankings(raw, scale):
+    copies = []
+    for copy in range(scale):
+        rows = raw.copy()
+        if copy:
+            rows["Name"] = rows["Name"] + f" #{copy}"
+        rows["Rank"] = (rows["Rank"] - 1) * scale + copy + 1
+        copies.append(rows)
+    return pd.concat(copies, ignore_index=True)
+
+
+# Run fn `repeat` times; returns the timings in seconds and the last result
+def timed(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return {"min": min(timings), "median": statistics.median(timings), "runs": repeat}, result
+
+
+def serialize(fig):
+    return pio.to_json(fig, validate=False)
+
+
+# Stage timings of every page for the CSV at csv_path
+def benchmark_dataset(csv_path, repeat):
+    report = {}
+
+    # Loading: parse and clean the CSV in one pass, ingest it into a store chunk by
+    # chunk, and read the store back memory-mapped
+    store = RankingStore([csv_path], store_dir=f"{csv_path}.store")
+    report["load"] = {
+        "csv": timed(lambda: read_csv(csv_path), repeat)[0],
+        "ingest": timed(store.ingest, 1)[0],
+        "store_read": timed(store.load, repeat)[0],
+    }
+    data = store.load()
+    report["load"]["rows"] = len(data)
+    report["load"]["memory_bytes"] = int(data.memory_usage(deep=True).sum())
+
+    report["index"] = {
+        "ranking_index": timed(lambda: RankingIndex(data), repeat)[0],
+        "name_search": timed(lambda: NameSearch(data), 1)[0],
+    }
+    index = RankingIndex(data)
+    name_search = NameSearch(data)
+    year = index.years[-1]
+    leader = top_universities(index, year, n=1)["Name"].iloc[0]
+    peer_group = list(top_universities(index, year, n=50)["Name"])
+
+    # Dataset Preview: a filter on every kind of column, a sort by a categorical
+    # column, one page of rows, and the CSV download of the whole table
+    leader_country = top_universities(index, year, n=1)["Country"].iloc[0]
+    preview_filter = (index.years[-2:], [leader_country], "univ", (("Rank", (1, 1000)),))
+    stats, positions = timed(lambda: filter_positions(index, *preview_filter), repeat)
+    all_positions = filter_positions(index)
+    stats_sort, sorted_positions = timed(lambda: sort_positions(data, all_positions, "Name"), repeat)
+    report["dataset_preview"] = {
+        "filter": stats,
+        "sort": stats_sort,
+        "page": timed(lambda: data.take(sorted_positions[:25]), repeat)[0],
+        "csv": timed(lambda: "".join(iter_csv(data, all_positions)), repeat)[0],
+        "filtered_rows": len(positions),
+    }
+
+    stats, top_10_data = timed(lambda: top_universities(index, year), repeat)
+    stats_fig, fig = timed(lambda: top10_figure(top_10_data, year), repeat)
+    report["top10"] = {"filter": stats, "figure": stats_fig, "serialize": timed(lambda: serialize(fig), repeat)[0]}
+
+    stats, uni_data = timed(lambda: index.university(leader), repeat)
+    report["performance"] = {
+        "filter": stats,
+        "aggregate": timed(lambda: history_summary(uni_data, "Rank", best="min"), repeat)[0],
+    }
+    stats_fig, fig = timed(lambda: performance_figure(uni_data, leader), repeat)
+    report["performance"].update(figure=stats_fig, serialize=timed(lambda: serialize(fig), repeat)[0])
+
+    report["population"] = {
+        "filter": timed(lambda: index.university(leader), repeat)[0],
+        "aggregate": timed(lambda: history_summary(uni_data, "Student Population", best="max"), repeat)[0],
+    }
+    stats_fig, fig = timed(lambda: population_figure(uni_data, leader), repeat)
+    report["population"].update(figure=stats_fig, serialize=timed(lambda: serialize(fig), repeat)[0])
+
+    stats, aggregates = timed(lambda: country_aggregates(data), repeat)
+    stats_fig, fig = timed(lambda: country_map_figure(aggregates.by_year_country, year), repeat)
+    stats_full, full_fig = timed(lambda: country_map_figure(aggregates.by_year_country), repeat)
+    report["country_map"] = {
+        "aggregate": stats,
+        "figure": stats_fig,
+        "serialize": timed(lambda: serialize(fig), repeat)[0],
+        "figure_full_animation": stats_full,
+        "serialize_full_animation": timed(lambda: serialize(full_fig), repeat)[0],
+    }
+
+    stats, comparison_data_long = timed(
+        lambda: compare_universities(index, peer_group, (index.years[0], year)), repeat
+    )
+    stats_fig, fig = timed(lambda: comparison_figure(comparison_data_long, index.years[0], year), repeat)
+    report["comparison"] = {
+        "filter": stats,
+        "figure": stats_fig,
+        "serialize": timed(lambda: serialize(fig), repeat)[0],
+        "universities": len(peer_group),
+    }
+
+    stats, movements = timed(lambda: rank_movements(data), repeat)
+    report["movers"] = {
+        "aggregate": stats,
+        "filter": timed(lambda: (top_movers(movements, year), top_movers(movements, year, fallers=True),
+                                 trend_leaders(movements), trend_leaders(movements, declining=True)), repeat)[0],
+    }
+
+    report["search"] = {"query": timed(lambda: name_search.search("univ of techn"), repeat)[0]}
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the page computations of the rankings explorer.")
+    parser.add_argument("--csv", default=DATA_FILE, help="source CSV (default: %(default)s)")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100],
+                        help="dataset sizes as multiples of the source CSV (default: 1 10 100)")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per timed stage (default: %(default)s)")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    report = {
+        "environment": {
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "plotly": plotly.__version__,
+            "platform": platform.platform(),
+        },
+        "source": os.path.basename(args.csv),
+        "repeat": args.repeat,
+        "scales": {},
+    }
+    raw = pd.read_csv(args.csv)
+    with tempfile.TemporaryDirectory() as workdir:
+        for scale in args.scales:
+            print(f"Benchmarking {scale}x ...", file=sys.stderr)
+            csv_path = os.path.join(workdir, f"rankings-{scale}x.csv")
+            if scale == 1:
+                shutil.copyfile(args.csv, csv_path)
+            else:
+                synthetic_rankings(raw, scale).to_csv(csv_path, index=False)
+            report["scales"][str(scale)] = benchmark_dataset(csv_path, args.repeat)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
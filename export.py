@@ -0,0 +1,133 @@
+import argparse
+import json
+import os
+import re
+import time
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+
+import plotly.io as pio
+from plotly.offline import get_plotlyjs
+
+from figures import country_map_figure, performance_figure, population_figure, top10_figure
+from ingest import STORE_DIR, RankingStore
+from rankings import RankingIndex, country_aggregates, top_universities
+
+# Batch export of the standard views to static files, for serving from a plain
+# file server or CDN. Every figure is written as HTML and/or Plotly JSON and
+# listed in manifest.json:
+#
+#   top10/<year>          Top 10 Universities of each year
+#   country_map/<year>    country distribution of each year, country_map/all animated
+#   performance/<slug>    ranking trend of each of the top universities
+#   population/<slug>     student population of each of the top universities
+#
+#   python export.py --out export --universities 300 --workers 4
+
+EXPORT_DIR = "export"
+PLOTLY_JS = "plotly.min.js"
+
+# Dataset of the current worker process, loaded once by init_worker
+_worker = {}
+
+
+def init_worker(store_dir):
+    data = RankingStore(store_dir=store_dir).load()
+    _worker["index"] = RankingIndex(data)
+    _worker["aggregates"] = country_aggregates(data)
+
+
+# File-name friendly form of a university name
+def slugify(name):
+    ascii_name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode()
+    return re.sub(r"[^a-z0-9]+", "-", ascii_name.lower()).strip("-") or "university"
+
+
+def build_figure(page, param):
+    index = _worker["index"]
+    if page == "top10":
+        return top10_figure(top_universities(index, param), param)
+    if page == "country_map":
+        return country_map_figure(_worker["aggregates"].by_year_country, param)
+    if page == "performance":
+        return performance_figure(index.university(param), param)
+    if page == "population":
+        return population_figure(index.university(param), param)
+    raise ValueError(f"unknown page {page!r}")
+
+
+# Build one figure and write its artifacts; returns its manifest entry
+def render(task):
+    page, param, name, out_dir, formats = task
+    fig = build_figure(page, param)
+    os.makedirs(os.path.join(out_dir, page), exist_ok=True)
+    entry = {"page": page, "param": param, "files": {}}
+    if "json" in formats:
+        path = f"{page}/{name}.json"
+        with open(os.path.join(out_dir, path), "w") as f:
+            f.write(pio.to_json(fig, validate=False))
+        entry["files"]["json"] = path
+    if "html" in formats:
+        # The pages share one copy of plotly.js at the root of the export
+        path = f"{page}/{name}.html"
+        fig.write_html(os.path.join(out_dir, path), include_plotlyjs=f"../{PLOTLY_JS}", full_html=True)
+        entry["files"]["html"] = path
+    return entry
+
+
+# Figures to export: every year, the full animation, and the trend pages of the
+# universities ranked best in the latest year
+def export_tasks(index, n_universities):
+    tasks = [("top10", year, str(year)) for year in index.years]
+    tasks += [("country_map", year, str(year)) for year in index.years]
+    tasks.append(("country_map", None, "all"))
+
+    slugs = set()
+    for name in top_universities(index, index.years[-1], n=n_universities)["Name"].astype(str):
+        slug = slugify(name)
+        while slug in slugs:
+            slug += "-x"
+        slugs.add(slug)
+        tasks += [("performance", name, slug), ("population", name, slug)]
+    return tasks
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pre-render the standard views to static HTML/JSON files.")
+    parser.add_argument("--out", default=EXPORT_DIR, help="output directory (default: %(default)s)")
+    parser.add_argument("--universities", type=int, default=300,
+                        help="export trend pages for this many top universities (default: %(default)s)")
+    parser.add_argument("--formats", nargs="+", choices=["html", "json"], default=["html", "json"],
+                        help="artifact formats (default: html json)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="worker processes (default: number of CPUs)")
+    parser.add_argument("--store-dir", default=STORE_DIR, help="store directory (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    store = RankingStore(store_dir=args.store_dir)
+    store.ingest()
+    index = RankingIndex(store.load())
+    tasks = [(page, param, name, args.out, args.formats) for page, param, name in export_tasks(index, args.universities)]
+
+    os.makedirs(args.out, exist_ok=True)
+    if "html" in args.formats:
+        with open(os.path.join(args.out, PLOTLY_JS), "w") as f:
+            f.write(get_plotlyjs())
+
+    with ProcessPoolExecutor(args.workers, initializer=init_worker, initargs=(args.store_dir,)) as pool:
+        entries = list(pool.map(render, tasks, chunksize=8))
+
+    manifest = {
+        "dataset_version": store.version,
+        "year_versions": store.year_versions,
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "figures": entries,
+    }
+    with open(os.path.join(args.out, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=1)
+    print(f"Exported {len(entries)} figures to {args.out}/ in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
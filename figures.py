@@ -0,0 +1,201 @@
+import os
+import threading
+from collections import OrderedDict
+
+import plotly.express as px
+import plotly.io as pio
+
+
+# Choropleth of the number of ranked universities per country. Without a year
+# every year becomes an animation frame; with one only that year's frame is built,
+# keeping the colour scale of the full animation so years stay comparable.
+def country_map_figure(country_counts, year=None):
+    if year is None:
+        frame_data, animation_frame = country_counts, "Year"
+        title = "📊 Jumlah Universitas per Negara dari Tahun ke Tahun"
+    else:
+        frame_data, animation_frame = country_counts[country_counts["Year"] == year], None
+        title = f"📊 Jumlah Universitas per Negara pada Tahun {year}"
+
+    fig = px.choropleth(
+        frame_data,
+        locations="Country",  # Kolom negara
+        locationmode="country names",  # Menggunakan nama negara
+        color="Count",  # Data yang akan divisualisasikan
+        animation_frame=animation_frame,  # Animasi berdasarkan tahun
+        hover_data={"Mean Overall Score": ":.1f", "Median Rank": True},
+        range_color=(0, country_counts["Count"].max()),
+        title=title,
+        labels={"Count": "Jumlah Universitas", "Country": "Negara"},
+        color_continuous_scale=px.colors.sequential.Plasma,
+        projection="natural earth"  # Menggunakan proyeksi peta yang lebih menarik
+    )
+
+    # Menambahkan anotasi untuk meningkatkan pemahaman
+    fig.update_layout(
+        title_x=0,  # Align title to the left
+        title_xanchor='left',  # Anchor the title to the left
+        title_font=dict(size=24),  # Increase title font size
+        geo=dict(
+            showcoastlines=True,
+            coastlinecolor="Black",
+            showland=True,
+            landcolor="lightgray",
+            subunitcolor="Black",
+            countrycolor="Black"
+        ),
+        margin=dict(l=0, r=0, t=40, b=0)  # Adjust margins
+    )
+    return fig
+
+
+# Horizontal bar chart of a year's top universities, best rank at the top
+def top10_figure(top_10_data, year):
+    # Create a horizontal bar chart
+    fig = px.bar(
+        top_10_data,
+        x="Rank",
+        y="Name",
+        title=f"Top 10 Universities in {year}",
+        labels={"Name": "University", "Rank": "Rank"},
+        text="Rank",
+        orientation="h",  # Horizontal bar chart
+        color="Rank",  # Color by rank for better visual distinction
+        color_continuous_scale=px.colors.sequential.Viridis  # Use a sequential color scale
+    )
+
+    # Reverse the order of the y-axis to show the best rank at the top
+    fig.update_yaxes(autorange="reversed")
+
+    fig.update_traces(texttemplate='%{text}', textposition='outside')  # Show rank outside the bars
+    fig.update_layout(xaxis=dict(title='Rank (1 is best)', autorange='reversed'))  # Clear x-axis title
+    return fig
+
+
+# Ranking trend of one university over the years
+def performance_figure(uni_data, university):
+    fig = px.line(
+        uni_data,
+        x="Year",
+        y="Rank",
+        title=f"📊 Ranking Trend of {university} Over Time",
+        labels={"Rank": "Rank", "Year": "Year"},
+        markers=True
+    )
+    fig.update_yaxes(autorange="reversed")  # Best rank (1) at the top
+    return fig
+
+
+# Student population of one university over the years, with the area under the line filled
+def population_figure(uni_data, university):
+    # Create a line chart for student population growth
+    fig = px.line(
+        uni_data,
+        x="Year",
+        y="Student Population",
+        title=f"📊 Pertumbuhan Populasi Mahasiswa untuk {university}",
+        labels={"Student Population": "Jumlah Mahasiswa", "Year": "Tahun"},
+        markers=True
+    )
+
+    # Add a fill area under the line for better visualization
+    fig.add_scatter(
+        x=uni_data["Year"],
+        y=uni_data["Student Population"],
+        fill='tozeroy',
+        mode='none',
+        fillcolor='rgba(0, 100, 200, 0.2)'  # Light blue fill
+    )
+
+    # Update layout for better aesthetics
+    fig.update_layout(
+        title_x=0,  # Align title to the left
+        title_xanchor='left',  # Anchor the title to the left
+        title_font=dict(size=20),  # Increase title font size
+        xaxis=dict(title='Tahun'),
+        yaxis=dict(title='Jumlah Mahasiswa'),
+        margin=dict(l=40, r=40, t=40, b=40),  # Adjust margins
+        hovermode="x unified"  # Unified hover for better readability
+    )
+    return fig
+
+
+# Grouped bars for a single year, or one trend line per university and metric
+# for a range of years
+def comparison_figure(comparison_data_long, start_year, end_year):
+    n_universities = comparison_data_long["University"].nunique()
+    if start_year == end_year:
+        # Visualisasi perbandingan untuk satu tahun
+        fig = px.bar(comparison_data_long,
+                    x='University',
+                    y='Score',
+                    color='Metric',
+                    title=f"📊 Perbandingan {n_universities} Universitas ({start_year})",
+                    labels={"Score": "Score", "Metric": "Metrics"},
+                    barmode='group',
+                    color_discrete_sequence=px.colors.qualitative.Set2)  # Use a qualitative color palette
+        xaxis_title = 'Universities'
+    else:
+        # Tren setiap metrik sepanjang rentang tahun
+        fig = px.line(comparison_data_long,
+                     x='Year',
+                     y='Score',
+                     color='University',
+                     facet_col='Metric',
+                     facet_col_wrap=2,
+                     markers=True,
+                     title=f"📊 Perbandingan {n_universities} Universitas ({start_year}-{end_year})",
+                     labels={"Score": "Score", "Metric": "Metrics"})
+        xaxis_title = 'Year'
+
+    # Menambahkan anotasi untuk meningkatkan pemahaman
+    fig.update_layout(
+        title_x=0,  # Align title to the left
+        title_xanchor='left',  # Anchor the title to the left
+        title_font=dict(size=16),  # Decrease title font size
+        margin=dict(l=40, r=40, t=40, b=40)  # Adjust margins
+    )
+    fig.update_xaxes(title=xaxis_title)
+    fig.update_yaxes(title='Score')
+    return fig
+
+
+# LRU cache of serialized figures shared by every session. Entries are keyed on
+# (page, parameters, dataset version) and stored as Plotly JSON; the least recently
+# used ones are evicted once the stored JSON exceeds max_bytes.
+class FigureCache:
+    def __init__(self, max_bytes=int(os.environ.get("FIGURE_CACHE_MB", 64)) * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    # Serialized figure for key, calling build() to create it on a miss
+    def get_json(self, key, build):
+        with self._lock:
+            spec = self._entries.get(key)
+            if spec is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return spec
+            self.misses += 1
+
+        # Built outside the lock so a slow figure does not block other sessions
+        spec = pio.to_json(build(), validate=False)
+        if len(spec) <= self.max_bytes:
+            with self._lock:
+                if key not in self._entries:
+                    self._entries[key] = spec
+                    self.size += len(spec)
+                while self.size > self.max_bytes:
+                    _, evicted = self._entries.popitem(last=False)
+                    self.size -= len(evicted)
+        return spec
+
+    def get(self, key, build):
+        return pio.from_json(self.get_json(key, build))
@@ -0,0 +1,312 @@
+import argparse
+import glob
+import json
+import os
+import threading
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.feather as feather
+import pyarrow.ipc as ipc
+
+from rankings import (COLUMN_DTYPES, DATA_FILE, REQUIRED_COLUMNS, RankingIndex, normalize_rankings,
+                      year_from_filename)
+
+try:
+    import fcntl
+except ImportError:  # Windows: replicas sharing a store must not ingest at the same time
+    fcntl = None
+
+# Incremental ingest of ranking files into a columnar store. The main CSV and
+# every CSV dropped into data/ (a 2026 release, subject rankings, ...) are read in
+# chunks, validated and normalized chunk by chunk, and written as one Arrow part
+# per source file under .cache/store/. A manifest records which source each part
+# came from and a version token per year, so a new file only invalidates the
+# years it contains. Each (Name, Year) may come from one source only: a file
+# that repeats rows already in the store (a release the main CSV already covers,
+# a subject ranking of the same universities) is rejected into errors, and the
+# source ingested first keeps its rows. The store is refreshed by the app on
+# each rerun, or ahead of time with:
+#
+#   python ingest.py
+
+SOURCE_DIR = "data"
+STORE_DIR = os.path.join(".cache", "store")
+CHUNK_ROWS = 50_000
+# Bump when the schema or the cleaning rules change so existing stores are rebuilt
+STORE_VERSION = 1
+
+PART_SCHEMA = pa.schema([
+    (col, pa.string() if dtype == "str" else pa.from_numpy_dtype(np.dtype(dtype)))
+    for col, dtype in COLUMN_DTYPES.items()
+])
+
+
+# The main CSV followed by the CSVs in source_dir, in name order
+def discover_sources(csv_path=DATA_FILE, source_dir=SOURCE_DIR):
+    sources = [csv_path] if os.path.exists(csv_path) else []
+    return sources + sorted(glob.glob(os.path.join(source_dir, "*.csv")))
+
+
+# Validated and normalized chunks of one rankings file
+def read_chunks(path, chunk_rows=CHUNK_ROWS):
+    file_year = year_from_filename(path)
+    with pd.read_csv(path, chunksize=chunk_rows) as reader:
+        for chunk in reader:
+            if "Year" not in chunk.columns and file_year is not None:
+                chunk["Year"] = file_year
+            missing_columns = [col for col in REQUIRED_COLUMNS if col not in chunk.columns]
+            if missing_columns:
+                raise ValueError(f"missing required columns {missing_columns}")
+            yield normalize_rankings(chunk), len(chunk)
+
+
+IngestResult = namedtuple("IngestResult", ["ingested", "removed", "affected_years", "errors"])
+
+
+class RankingStore:
+    def __init__(self, sources=None, store_dir=STORE_DIR, chunk_rows=CHUNK_ROWS):
+        self._sources = sources
+        self.store_dir = store_dir
+        self.chunk_rows = chunk_rows
+        self.manifest_path = os.path.join(store_dir, "manifest.json")
+        self.manifest = self._read_manifest()
+
+    def sources(self):
+        return discover_sources() if self._sources is None else list(self._sources)
+
+    # Dataset version; changes whenever a source is ingested or removed
+    @property
+    def version(self):
+        return f"{STORE_VERSION}.{self.manifest['revision']}"
+
+    # Version token per year; only changes when rows of that year are added or removed
+    @property
+    def year_versions(self):
+        return {int(year): token for year, token in self.manifest["year_versions"].items()}
+
+    @property
+    def errors(self):
+        return {path: error["message"] for path, error in self.manifest["errors"].items()}
+
+    @property
+    def parts(self):
+        return tuple(entry["part"] for entry in self.manifest["sources"])
+
+    def _read_manifest(self):
+        try:
+            with open(self.manifest_path) as f:
+                manifest = json.load(f)
+            if manifest.get("store_version") == STORE_VERSION:
+                return manifest
+        except (OSError, ValueError):
+            pass
+        return {"store_version": STORE_VERSION, "revision": 0, "next_part": 0,
+                "sources": [], "year_versions": {}, "errors": {}}
+
+    def _write_manifest(self):
+        tmp_path = f"{self.manifest_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.manifest, f, indent=1)
+        os.replace(tmp_path, self.manifest_path)
+
+    # Sources whose file no longer matches what was ingested, and files not ingested yet
+    def _pending(self, stats):
+        stale = [entry for entry in self.manifest["sources"]
+                 if stats.get(entry["path"]) != (entry["mtime_ns"], entry["size"])]
+        ingested = {entry["path"] for entry in self.manifest["sources"]}
+        failed = {path: (error["mtime_ns"], error["size"]) for path, error in self.manifest["errors"].items()}
+        new = [path for path in stats if path not in ingested and failed.get(path) != stats[path]]
+        return stale, new
+
+    # Nothing to ingest, and no recorded error for a file that has since been removed
+    def _up_to_date(self, stats, stale, new):
+        return not stale and not new and all(path in stats for path in self.manifest["errors"])
+
+    def _stat_sources(self):
+        stats = {}
+        for path in self.sources():
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:  # removed since the directory was listed
+                continue
+            stats[path] = (stat.st_mtime_ns, stat.st_size)
+        return stats
+
+    # (Name, Year) of every row in the store
+    def _stored_keys(self):
+        keys = [feather.read_table(os.path.join(self.store_dir, part), columns=["Name", "Year"],
+                                   memory_map=True).to_pandas() for part in self.parts]
+        return pd.MultiIndex.from_frame(pd.concat(keys) if keys else pd.DataFrame({"Name": [], "Year": []}))
+
+    # Stream one source file into a new part, chunk by chunk. The part is only kept
+    # when none of its (Name, Year) pairs repeat within the file or appear in
+    # `existing`; returns the manifest entry and the keys of the new rows.
+    def _ingest_file(self, path, stat, existing):
+        part = f"part-{self.manifest['next_part']:05d}.arrow"
+        self.manifest["next_part"] += 1
+        part_path = os.path.join(self.store_dir, part)
+        tmp_path = f"{part_path}.{os.getpid()}.tmp"
+        rows = dropped = 0
+        years = set()
+        keys = []
+        try:
+            with pa.OSFile(tmp_path, "wb") as sink, ipc.new_file(sink, PART_SCHEMA) as writer:
+                for chunk, read in read_chunks(path, self.chunk_rows):
+                    writer.write_batch(pa.RecordBatch.from_pandas(chunk, schema=PART_SCHEMA, preserve_index=False))
+                    rows += len(chunk)
+                    dropped += read - len(chunk)
+                    years.update(int(year) for year in chunk["Year"].unique())
+                    keys.append(chunk[["Name", "Year"]])
+            keys = pd.MultiIndex.from_frame(pd.concat(keys) if keys else pd.DataFrame({"Name": [], "Year": []}))
+            repeated = keys[keys.duplicated() | keys.isin(existing)].unique()
+            if len(repeated):
+                examples = ", ".join(f"{name} ({year})" for name, year in repeated[:3])
+                raise ValueError(f"{len(repeated)} (Name, Year) pairs appear twice in the file or are already ingested "
+                                 f"from another file, e.g. {examples}")
+            os.replace(tmp_path, part_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        entry = {"path": path, "mtime_ns": stat[0], "size": stat[1], "part": part,
+                 "rows": rows, "dropped": dropped, "years": sorted(years)}
+        return entry, keys
+
+    # Bring the store up to date with the source files. Removed or changed sources
+    # lose their part (a changed file is then ingested again as a new part), new
+    # files are appended, and the year versions of every affected year are bumped.
+    # Files that cannot be read or fail validation are recorded in errors and
+    # skipped until they change, or until another source changes or is removed,
+    # which may resolve a conflict over repeated (Name, Year) rows.
+    def ingest(self):
+        stats = self._stat_sources()
+        stale, new = self._pending(stats)
+        if self._up_to_date(stats, stale, new):
+            return IngestResult([], [], set(), self.errors)
+
+        os.makedirs(self.store_dir, exist_ok=True)
+        with open(os.path.join(self.store_dir, "ingest.lock"), "w") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            # Another replica may have ingested while we waited for the lock
+            self.manifest = self._read_manifest()
+            stale, new = self._pending(stats)
+            if self._up_to_date(stats, stale, new):
+                return IngestResult([], [], set(), self.errors)
+
+            affected_years = set()
+            for entry in stale:
+                self.manifest["sources"].remove(entry)
+                affected_years.update(entry["years"])
+                part_path = os.path.join(self.store_dir, entry["part"])
+                if os.path.exists(part_path):
+                    os.remove(part_path)
+            new += [entry["path"] for entry in stale if entry["path"] in stats]
+            if stale:
+                new += [path for path in self.manifest["errors"] if path in stats and path not in new]
+            # Ingest in source order, so the main CSV keeps its rows over the files in data/
+            new = [path for path in stats if path in new]
+
+            existing = self._stored_keys()
+            ingested = []
+            for path in new:
+                try:
+                    entry, keys = self._ingest_file(path, stats[path], existing)
+                except (ValueError, pd.errors.ParserError, UnicodeDecodeError, OSError, pa.ArrowException) as e:
+                    self.manifest["errors"][path] = {"mtime_ns": stats[path][0], "size": stats[path][1],
+                                                     "message": str(e)}
+                    continue
+                existing = existing.append(keys)
+                self.manifest["errors"].pop(path, None)
+                self.manifest["sources"].append(entry)
+                affected_years.update(entry["years"])
+                ingested.append(path)
+
+            for path in list(self.manifest["errors"]):
+                if path not in stats:
+                    del self.manifest["errors"][path]
+            self.manifest["revision"] += 1
+            present_years = {year for entry in self.manifest["sources"] for year in entry["years"]}
+            for year in affected_years:
+                self.manifest["year_versions"][str(year)] = self.manifest["revision"]
+            for year in list(self.manifest["year_versions"]):
+                if int(year) not in present_years:
+                    del self.manifest["year_versions"][year]
+            self._write_manifest()
+
+        removed = [entry["path"] for entry in stale if entry["path"] not in stats]
+        return IngestResult(ingested, removed, affected_years, self.errors)
+
+    # The whole store as one frame. Parts are memory-mapped and concatenated in
+    # ingest order, so rows appended by later ingests always come last.
+    def load(self):
+        tables = [feather.read_table(os.path.join(self.store_dir, part), memory_map=True) for part in self.parts]
+        table = pa.concat_tables(tables) if tables else PART_SCHEMA.empty_table()
+        for col in ["Name", "Country"]:
+            position = table.schema.get_field_index(col)
+            table = table.set_column(position, col, pc.dictionary_encode(table[col]))
+        return table.to_pandas()
+
+
+DatasetSnapshot = namedtuple("DatasetSnapshot", ["version", "data", "index", "year_versions", "errors", "parts"])
+
+
+# The loaded dataset and its row index, kept in step with the store. When the only
+# change is new parts appended after the ones already loaded, the existing index
+# is extended with the new rows instead of being rebuilt.
+class LiveDataset:
+    def __init__(self, store):
+        self.store = store
+        self.snapshot = None
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        with self._lock:
+            self.store.ingest()
+            previous = self.snapshot
+            if previous is not None and previous.version == self.store.version:
+                return previous
+            if not self.store.parts:
+                raise FileNotFoundError(f"No rankings data found in {DATA_FILE!r} or {SOURCE_DIR}/*.csv")
+
+            data = self.store.load()
+            parts = self.store.parts
+            if previous is not None and parts[:len(previous.parts)] == previous.parts:
+                index = previous.index.extended(data, len(previous.data))
+            else:
+                index = RankingIndex(data)
+            self.snapshot = DatasetSnapshot(self.store.version, data, index, self.store.year_versions,
+                                            self.store.errors, parts)
+            return self.snapshot
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ingest ranking CSV files into the columnar store.")
+    parser.add_argument("sources", nargs="*",
+                        help=f"CSV files to ingest (default: {DATA_FILE!r} and {SOURCE_DIR}/*.csv)")
+    parser.add_argument("--store-dir", default=STORE_DIR, help="store directory (default: %(default)s)")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS,
+                        help="rows read per chunk (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    store = RankingStore(args.sources or None, args.store_dir, args.chunk_rows)
+    result = store.ingest()
+    for path in result.ingested:
+        print(f"Ingested {path}")
+    for path in result.removed:
+        print(f"Removed {path}")
+    if result.affected_years:
+        print(f"Affected years: {', '.join(map(str, sorted(result.affected_years)))}")
+    elif not result.errors:
+        print("Store is up to date")
+    for path, message in result.errors.items():
+        print(f"Skipped {path}: {message}")
+    print(f"Store version {store.version}: {sum(entry['rows'] for entry in store.manifest['sources'])} rows "
+          f"from {len(store.parts)} source(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Opt-in stage instrumentation for the app. A StageRecorder times the stages of
+# one rerun (load, filter, aggregate, figure, serialize) and a process-wide
+# MetricsRegistry accumulates them for the log file and Prometheus sinks.
+#
+# Peak memory comes from tracemalloc, which only runs while an enabled stage is
+# in progress and is stopped again when the last one ends, so sessions without
+# instrumentation never pay for it afterwards. tracemalloc has one process-wide
+# peak, so peaks are approximate when stages of concurrent reruns overlap: the
+# peak is only reset when no other stage is running, and an overlapping stage
+# reports the highest traced memory since the earliest of the running stages
+# began, including the allocations of the others. It never under-reports.
+
+# Number of enabled stages in progress, across all sessions
+_tracing_lock = threading.Lock()
+_active_stages = 0
+
+
+# Start tracing for a stage; returns the traced memory at its start
+def _start_tracing():
+    global _active_stages
+    with _tracing_lock:
+        _active_stages += 1
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        if _active_stages == 1:
+            tracemalloc.reset_peak()
+        return tracemalloc.get_traced_memory()[0]
+
+
+# End tracing for a stage; returns the peak of traced memory during it
+def _stop_tracing():
+    global _active_stages
+    with _tracing_lock:
+        _, peak = tracemalloc.get_traced_memory()
+        _active_stages -= 1
+        if _active_stages == 0:
+            tracemalloc.stop()
+        return peak
+
+
+# Wall time and peak memory of each stage of one rerun
+class StageRecorder:
+    def __init__(self, page, enabled=True):
+        self.page = page
+        self.enabled = enabled
+        self.stages = []
+
+    @contextmanager
+    def stage(self, name):
+        if not self.enabled:
+            yield
+            return
+        baseline = _start_tracing()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            peak = _stop_tracing()
+            self.stages.append({
+                "page": self.page,
+                "stage": name,
+                "seconds": seconds,
+                "peak_bytes": max(peak - baseline, 0),
+            })
+
+
+# Stage totals of every rerun since the process started
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals = {}  # (page, stage) -> [count, seconds, max peak bytes]
+
+    def observe(self, stages):
+        with self._lock:
+            for record in stages:
+                totals = self._totals.setdefault((record["page"], record["stage"]), [0, 0.0, 0])
+                totals[0] += 1
+                totals[1] += record["seconds"]
+                totals[2] = max(totals[2], record["peak_bytes"])
+
+    # Prometheus text exposition format
+    def prometheus_text(self):
+        with self._lock:
+            totals = sorted(self._totals.items())
+        lines = [
+            "# HELP rankings_stage_seconds Wall time spent in each page stage.",
+            "# TYPE rankings_stage_seconds summary",
+        ]
+        for (page, stage), (count, seconds, _) in totals:
+            labels = f'page="{page}",stage="{stage}"'
+            lines.append(f"rankings_stage_seconds_sum{{{labels}}} {seconds:.6f}")
+            lines.append(f"rankings_stage_seconds_count{{{labels}}} {count}")
+        lines += [
+            "# HELP rankings_stage_peak_bytes Largest peak of traced memory seen in each page stage.",
+            "# TYPE rankings_stage_peak_bytes gauge",
+        ]
+        for (page, stage), (_, _, peak) in totals:
+            lines.append(f'rankings_stage_peak_bytes{{page="{page}",stage="{stage}"}} {peak}')
+        return "\n".join(lines) + "\n"
+
+    # Write the metrics for a node_exporter textfile collector, replacing the file atomically
+    def write_textfile(self, path):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp_path, path)
+
+
+# Append one JSON line per rerun
+def append_log(path, stages):
+    with open(path, "a") as f:
+        f.write(json.dumps({"time": time.time(), "stages": stages}) + "\n")
+
+
+# Serve the registry as a Prometheus scrape target on /metrics from a daemon thread.
+# Only local scrapers can reach it unless another host is given.
+def serve_metrics(registry, port, host="127.0.0.1"):
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.prometheus_text().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
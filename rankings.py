@@ -0,0 +1,381 @@
+import copy
+import os
+import re
+import unicodedata
+from collections import defaultdict, namedtuple
+
+import numpy as np
+import pandas as pd
+
+DATA_FILE = "THE World University Rankings 2016-2025.csv"
+
+SCORE_COLUMNS = ["Overall Score", "Teaching", "Research Environment", "Research Quality",
+                 "Industry Impact", "International Outlook"]
+# Columns of the dataset, in the order of the THE CSV, with their cleaned dtypes
+COLUMN_DTYPES = {
+    "Rank": "float64",
+    "Name": "str",
+    "Country": "str",
+    "Student Population": "float64",
+    "Students to Staff Ratio": "float64",
+    "International Students": "float32",
+    "Female to Male Ratio": "float32",
+    **{col: "float32" for col in SCORE_COLUMNS},
+    "Year": "int16",
+}
+# A rankings file must provide these; the other columns are left empty when missing
+REQUIRED_COLUMNS = ["Name", "Year", "Rank", "Country", "Teaching", "Research Environment", "Student Population"]
+
+
+# "26%" -> 26.0; a bare "%" has no value and becomes NaN
+def parse_percent(series):
+    return pd.to_numeric(series.str.rstrip("%"), errors="coerce").astype("float32")
+
+
+# Female share in percent, from the three encodings found in the CSV:
+#   "33 : 67"      plain ratio
+#   "46:54:00"     ratio that Excel read as a duration (hh:mm:ss)
+#   "0.438194444"  the same duration stored as a fraction of a day
+# Every ratio adds up to 100, so a duration of f hours + (100 - f) minutes is
+# f * 60 + (100 - f) minutes, i.e. f = (minutes - 100) / 59.
+def parse_female_ratio(series):
+    parts = series.str.extract(r"^\s*(\d+)\s*:\s*(\d+)")
+    female = pd.to_numeric(parts[0], errors="coerce")
+    male = pd.to_numeric(parts[1], errors="coerce")
+    share = female / (female + male) * 100
+
+    minutes = pd.to_numeric(series.where(parts[0].isna()), errors="coerce") * 24 * 60
+    from_days = ((minutes.round() - 100) / 59).where(lambda f: f.between(0, 100))
+    return share.fillna(from_days).astype("float32")
+
+
+# Numeric rank; THE publishes ties as "=5" and bands as "201–250" (lower bound kept)
+def parse_rank(series):
+    rank = pd.to_numeric(series, errors="coerce")
+    if rank.isna().any():
+        text = series.astype("string").str.extract(r"(\d+(?:\.\d+)?)")[0]
+        rank = rank.fillna(pd.to_numeric(text, errors="coerce"))
+    return rank
+
+
+# Bring a frame read from any rankings file to the dataset schema. Missing optional
+# columns are added empty and extra ones dropped, the text-encoded columns become
+# numbers, and rows without a name, country, year or rank are dropped.
+def normalize_rankings(data):
+    data = data.reindex(columns=list(COLUMN_DTYPES))
+    data["Rank"] = parse_rank(data["Rank"])
+    data["International Students"] = parse_percent(data["International Students"].astype("string"))
+    data["Female to Male Ratio"] = parse_female_ratio(data["Female to Male Ratio"].astype("string"))
+    for col in ["Year", "Student Population", "Students to Staff Ratio", *SCORE_COLUMNS]:
+        data[col] = pd.to_numeric(data[col], errors="coerce")
+    data = data.dropna(subset=["Name", "Country", "Year", "Rank"])
+    return data.astype(COLUMN_DTYPES)
+
+
+# Year in a file name such as "rankings-2026.csv", for files without a Year column
+def year_from_filename(path):
+    match = re.search(r"(?<!\d)(20\d\d)(?!\d)", os.path.basename(path))
+    return int(match.group(1)) if match else None
+
+
+# Parse and clean one rankings CSV in a single pass
+def read_csv(path=DATA_FILE):
+    data = pd.read_csv(path)
+    if "Year" not in data.columns:
+        data["Year"] = year_from_filename(path)
+    return normalize_rankings(data).astype({"Name": "category", "Country": "category"})
+
+
+# Sortable values of a column; categoricals sort by their codes
+def _sort_values(series):
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.codes.to_numpy()
+    return series.to_numpy()
+
+
+# Map each value of a key column to the row positions holding it, ordered by
+# the columns in sort_by. Positions are offset by `start`, for frames that are
+# the tail of a larger one.
+def _group_positions(data, key, *sort_by, start=0):
+    # np.lexsort sorts by its last key first
+    order = np.lexsort([_sort_values(data[col]) for col in reversed(sort_by)] + [_sort_values(data[key])])
+    keys = data[key].to_numpy()[order]
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    stops = np.r_[starts[1:], len(keys)]
+    return {keys[begin]: order[begin:end] + start for begin, end in zip(starts, stops)}
+
+
+# Add the positions of the rows from `start` on to an existing mapping; only the
+# keys present in those rows are re-sorted
+def _merge_positions(positions, data, start, key, sort_by):
+    merged = dict(positions)
+    sort_values = data[sort_by].to_numpy()
+    for value, new in _group_positions(data.iloc[start:], key, sort_by, start=start).items():
+        if value in merged:
+            combined = np.concatenate([merged[value], new])
+            new = combined[np.argsort(sort_values[combined], kind="stable")]
+        merged[value] = new
+    return merged
+
+
+# Lookup tables built once per dataset version. Each year maps to its rows
+# sorted by rank and each university to its rows sorted by year, so the page
+# filters take O(k) instead of scanning the whole frame.
+class RankingIndex:
+    def __init__(self, data):
+        self.data = data
+        self._by_year = _group_positions(data, "Year", "Rank")
+        self._by_name = _group_positions(data, "Name", "Year")
+        self.years = sorted(int(year) for year in self._by_year)
+
+    # Index of `data`, whose first `start` rows are the rows indexed here and whose
+    # remaining rows were appended since. Only the years and universities that
+    # appear in the appended rows are re-sorted.
+    def extended(self, data, start):
+        index = copy.copy(self)
+        index.data = data
+        index._by_year = _merge_positions(self._by_year, data, start, "Year", "Rank")
+        index._by_name = _merge_positions(self._by_name, data, start, "Name", "Year")
+        index.years = sorted(int(year) for year in index._by_year)
+        return index
+
+    # Rows of a year sorted by rank, optionally only the first `limit`
+    def year(self, year, limit=None):
+        return self.data.take(self._by_year.get(year, np.empty(0, dtype=int))[:limit])
+
+    # Row positions of several years, each year sorted by rank
+    def year_positions(self, years):
+        positions = [self._by_year[year] for year in years if year in self._by_year]
+        return np.concatenate(positions) if positions else np.empty(0, dtype=int)
+
+    def university(self, name):
+        return self.data.take(self._by_name.get(name, []))
+
+    # Rows of several universities in one take, grouped in the order given
+    def universities(self, names):
+        positions = [self._by_name[name] for name in names if name in self._by_name]
+        return self.data.take(np.concatenate(positions) if positions else [])
+
+
+# Rows shown by the Top 10 page; the index keeps each year sorted by rank
+def top_universities(index, year, n=10):
+    return index.year(year, limit=n)
+
+
+# Evaluate a predicate on the rows at `positions` of a column. For categoricals it
+# runs once per category and is mapped back through the codes.
+def _match(series, positions, predicate):
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Code -1 (missing) picks the trailing False
+        matches = np.append(predicate(pd.Series(series.cat.categories)).to_numpy(dtype=bool), False)
+        return matches[series.cat.codes.to_numpy()[positions]]
+    return predicate(series.take(positions)).to_numpy(dtype=bool)
+
+
+# Row positions of the Dataset Preview table after its filters: years, countries,
+# a case-insensitive name substring and inclusive (low, high) ranges of numeric
+# columns. Rows come from the index in year then rank order.
+def filter_positions(index, years=None, countries=None, name=None, ranges=()):
+    data = index.data
+    positions = index.year_positions(years or index.years)
+    keep = np.ones(len(positions), dtype=bool)
+    if countries:
+        keep &= _match(data["Country"], positions, lambda values: values.isin(countries))
+    if name:
+        keep &= _match(data["Name"], positions, lambda values: values.str.contains(name, case=False, regex=False))
+    for col, (low, high) in ranges:
+        values = data[col].to_numpy()[positions]
+        keep &= (values >= low) & (values <= high)
+    return positions[keep]
+
+
+# Values of a column that sort in display order; categoricals sort by their
+# labels, not by their codes
+def _ordered_values(series):
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        label_order = np.empty(len(series.cat.categories))
+        label_order[series.cat.categories.argsort()] = np.arange(len(series.cat.categories))
+        codes = series.cat.codes.to_numpy()
+        return np.where(codes >= 0, label_order[codes], np.nan)
+    return series.to_numpy()
+
+
+# Positions reordered by a column, missing values last; ties keep their order
+def sort_positions(data, positions, column=None, ascending=True):
+    if column is None:
+        return positions
+    values = pd.Series(_ordered_values(data[column].take(positions)))
+    order = values.sort_values(ascending=ascending, kind="stable", na_position="last").index.to_numpy()
+    return positions[order]
+
+
+CSV_CHUNK_ROWS = 10_000
+
+
+# CSV text of the rows at `positions`, produced chunk by chunk so a large
+# selection is never copied into one frame
+def iter_csv(data, positions, chunk_rows=CSV_CHUNK_ROWS):
+    for start in range(0, max(len(positions), 1), chunk_rows):
+        yield data.take(positions[start:start + chunk_rows]).to_csv(index=False, header=start == 0)
+
+
+# Best, first and latest value of a column in one university's history, as shown
+# in the insights of the Performance and Student Population pages
+def history_summary(uni_data, column, best="min"):
+    best_label = uni_data[column].idxmin() if best == "min" else uni_data[column].idxmax()
+    return {
+        "best": uni_data.at[best_label, column],
+        "best_year": uni_data.at[best_label, "Year"],
+        "first": uni_data[column].iloc[0],
+        "current": uni_data[column].iloc[-1],
+        "current_year": uni_data["Year"].iloc[-1],
+    }
+
+
+# Lowercase ASCII form of a name, so "Université" matches "universite"
+def _normalize_name(name):
+    decomposed = unicodedata.normalize("NFKD", name)
+    return " ".join("".join(c for c in decomposed if not unicodedata.combining(c)).lower().split())
+
+
+def _trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+# Trigram index over university names for search-as-you-type. Names are kept in
+# order of their most recent rank, which is also the order of results that tie.
+class NameSearch:
+    def __init__(self, data):
+        latest = data.sort_values(["Year", "Rank"], ascending=[False, True]).drop_duplicates("Name")
+        self.names = latest["Name"].astype(str).tolist()
+        self.name_countries = latest["Country"].astype(str).to_numpy()
+        self.countries = sorted(set(self.name_countries))
+        self._normalized = [_normalize_name(name) for name in self.names]
+
+        postings = defaultdict(list)
+        for position, name in enumerate(self._normalized):
+            for gram in _trigrams(name):
+                postings[gram].append(position)
+        self._postings = {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()}
+
+    # Best matches for a query, optionally restricted to one country. Names where
+    # a word starts with the query come first, then names containing it, then
+    # fuzzy matches sharing at least half of the query's trigrams.
+    def search(self, query, country=None, limit=20):
+        query = _normalize_name(query)
+        if query:
+            grams = _trigrams(query)
+            scores = np.zeros(len(self.names))
+            for gram in grams:
+                scores[self._postings.get(gram, [])] += 1
+            scores /= len(grams)
+            candidates = np.flatnonzero(scores >= 0.5)
+            for position in candidates:
+                name = self._normalized[position]
+                if f" {query}" in f" {name}":
+                    scores[position] = 3
+                elif query in name:
+                    scores[position] = 2
+        else:
+            scores = np.zeros(len(self.names))
+            candidates = np.arange(len(self.names))
+
+        if country:
+            candidates = candidates[self.name_countries[candidates] == country]
+        best = candidates[np.argsort(-scores[candidates], kind="stable")[:limit]]
+        return [self.names[position] for position in best]
+
+
+# Scores of N universities in long format (University, Year, Metric, Score) for a
+# single year or an inclusive (start, end) range of years. The rows come from one
+# index lookup and are reshaped with a single melt, without per-university loops.
+def compare_universities(index, names, years, metrics=SCORE_COLUMNS):
+    start, end = years if isinstance(years, tuple) else (years, years)
+    rows = index.universities(names)
+    rows = rows[rows["Year"].between(start, end)]
+    comparison = rows.melt(id_vars=["Name", "Year"], value_vars=list(metrics),
+                           var_name="Metric", value_name="Score")
+    comparison["Name"] = comparison["Name"].astype(str)
+    return comparison.rename(columns={"Name": "University"})
+
+
+CountryAggregates = namedtuple("CountryAggregates", ["by_year_country", "by_country"])
+
+
+COUNTRY_STATS = dict(
+    Count=("Name", "size"),
+    **{"Mean Overall Score": ("Overall Score", "mean"), "Median Rank": ("Rank", "median")},
+)
+
+
+# Counts and summary stats per (year, country). Each year only depends on its own
+# rows, so the app computes and caches them year by year.
+def year_country_aggregates(rows):
+    return rows.groupby(["Year", "Country"], observed=True).agg(**COUNTRY_STATS).reset_index()
+
+
+# Counts and summary stats per (year, country) and per country over all years
+# for the country distribution page; by_year_country may be passed in prebuilt
+def country_aggregates(data, by_year_country=None):
+    if by_year_country is None:
+        by_year_country = year_country_aggregates(data)
+    by_country = data.groupby("Country", observed=True).agg(
+        **COUNTRY_STATS, **{"Years Ranked": ("Year", "nunique")}
+    ).reset_index()
+    return CountryAggregates(by_year_country, by_country)
+
+
+
+RankMovements = namedtuple("RankMovements", ["by_year", "by_university"])
+
+
+# Rank movement of every university, computed for all of them at once with grouped
+# shifts and aggregations. by_year has one row per (university, year) with the rank
+# change since the university's previous ranked year (positive = climbed; banded
+# ranks count from the lower bound of the band). by_university holds the best,
+# first and current rank, the trend slope (least-squares ranks per year, negative =
+# improving) and the volatility (standard deviation of the yearly changes).
+def rank_movements(data):
+    rows = data[["Name", "Country", "Year", "Rank"]].sort_values(["Name", "Year"], kind="stable")
+    grouped = rows.groupby("Name", observed=True, sort=False)
+    rows["Previous Year"] = grouped["Year"].shift().astype("Int16")
+    rows["Previous Rank"] = grouped["Rank"].shift()
+    rows["Rank Change"] = rows["Previous Rank"] - rows["Rank"]
+
+    by_university = grouped.agg(**{
+        "Country": ("Country", "last"),
+        "Years Ranked": ("Year", "nunique"),
+        "First Year": ("Year", "first"),
+        "First Rank": ("Rank", "first"),
+        "Current Year": ("Year", "last"),
+        "Current Rank": ("Rank", "last"),
+        "Volatility": ("Rank Change", "std"),
+    })
+    best = rows.loc[grouped["Rank"].idxmin(), ["Name", "Year", "Rank"]].set_index("Name")
+    by_university["Best Rank"] = best["Rank"]
+    by_university["Best Year"] = best["Year"]
+    by_university["Net Change"] = by_university["First Rank"] - by_university["Current Rank"]
+
+    year_offset = rows["Year"] - grouped["Year"].transform("mean")
+    rank_offset = rows["Rank"] - grouped["Rank"].transform("mean")
+    sums = pd.DataFrame({"xy": year_offset * rank_offset, "xx": year_offset ** 2})
+    sums = sums.groupby(rows["Name"], observed=True).sum()
+    by_university["Trend Slope"] = sums["xy"] / sums["xx"].where(sums["xx"] > 0)
+
+    by_year = rows.sort_values(["Year", "Rank"], kind="stable").reset_index(drop=True)
+    return RankMovements(by_year, by_university)
+
+
+# Universities that climbed (or, with fallers=True, dropped) the most places in a year
+def top_movers(movements, year, n=10, fallers=False):
+    moved = movements.by_year[movements.by_year["Year"] == year].dropna(subset=["Rank Change"])
+    return moved.nsmallest(n, "Rank Change") if fallers else moved.nlargest(n, "Rank Change")
+
+
+# Universities with the steepest improving (or declining) rank trend among those
+# ranked in at least min_years years
+def trend_leaders(movements, n=10, min_years=3, declining=False):
+    ranked = movements.by_university[movements.by_university["Years Ranked"] >= min_years]
+    ranked = ranked.dropna(subset=["Trend Slope"])
+    return ranked.nlargest(n, "Trend Slope") if declining else ranked.nsmallest(n, "Trend Slope")